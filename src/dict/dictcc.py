@@ -3,6 +3,7 @@ from collections import defaultdict
 
 from src.dict import Dictionary
 from src.perf import Stopwatch
+from src.fileio import open_text
 
 class DictCCToken:
     """This class measures elapsed time from enter to exit in seconds"""
@@ -43,14 +44,14 @@ class DictCCDict(Dictionary):
         """Read dict.cc dictionary for DE-EN
 
         Args:
-            file_path (sts): File to dict.cc dictionary text
+            file_path (sts): File to dict.cc dictionary text, may be gzip, xz or zstd compressed
 
         Returns:
             dict: dictionary[word] containing list of EN translation
         """
         # dict.cc dictionary structure
         dictcc_dictionary: defaultdict[str, list[DictCCToken]] = defaultdict(list)
-        with open(file_path, "r", encoding="utf-8") as f:
+        with open_text(file_path) as f:
             for line in f:
                 # Split into: word, translation, pos
                 parts = [e.strip() for e in line.split("\t")]
@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.perf import Stopwatch
+from src.dict import Dictionary
+
+class LibreTranslateDict(Dictionary):
+    """Dictionary using a LibreTranslate compatible HTTP service, e.g. on localhost"""
+
+    def __init__(
+        self,
+        url: str,
+        from_lang: str,
+        to_lang: str,
+        batch_size: int = 32,
+        concurrency: int = 4,
+        timeout: float = 10.0,
+        retries: int = 3,
+        api_key: str | None = None,
+    ):
+        self.url = url.rstrip("/") + "/translate"
+        self.from_lang = from_lang
+        self.to_lang = to_lang
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.api_key = api_key
+        self.cache: dict[str, str] = {}
+        # texts of failed batches, not requested again
+        self.failed: set[str] = set()
+        self.session = self.create_session(concurrency, retries)
+
+    def create_session(self, concurrency: int, retries: int) -> requests.Session:
+        """Session with keep-alive connections pooled for all concurrent batches"""
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=None,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def request(self, texts: list[str]) -> list[str]:
+        """Translate a batch of texts with a single request"""
+        payload = {
+            "q": texts,
+            "source": self.from_lang,
+            "target": self.to_lang,
+            "format": "text",
+        }
+        if self.api_key:
+            payload["api_key"] = self.api_key
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        content = response.json()
+        translations = content.get("translatedText") if isinstance(content, dict) else None
+        if not isinstance(translations, list) or not all(isinstance(e, str) for e in translations):
+            raise ValueError(f"LibreTranslate returned no list of translated texts: {str(content)[:100]}")
+        if len(translations) != len(texts):
+            raise ValueError(f"LibreTranslate returned {len(translations)} translations for {len(texts)} texts")
+        return [e.strip() for e in translations]
+
+    def prefetch(self, texts: Iterable[str]):
+        """Translate texts in concurrent batches and keep them in the cache.
+
+        Texts of batches failing after their retries are reported and translate to None.
+        """
+        pending = [e for e in dict.fromkeys(texts) if e not in self.cache and e not in self.failed]
+        if len(pending) == 0:
+            return
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        with Stopwatch(f"LibreTranslate {len(pending)} texts in {len(batches)} batches"):
+            with ThreadPoolExecutor(self.concurrency) as executor:
+                futures = [executor.submit(self.request, batch) for batch in batches]
+                for batch, future in zip(batches, futures):
+                    try:
+                        self.cache.update(zip(batch, future.result()))
+                    except (requests.RequestException, ValueError) as e:
+                        print(f"LibreTranslate failed for {len(batch)} texts from '{batch[0]}': {e}")
+                        self.failed.update(batch)
+
+    def translate(self, text):
+        """Translate text, None if the request fails"""
+        cached = self.cache.get(text)
+        if cached is not None:
+            return cached
+        if text in self.failed:
+            return None
+        try:
+            translation = self.request([text])[0]
+        except (requests.RequestException, ValueError) as e:
+            print(f"LibreTranslate failed for '{text}': {e}")
+            self.failed.add(text)
+            return None
+        self.cache[text] = translation
+        return translation
+
+    def release(self, texts: Iterable[str]):
+        """Drop texts from the cache once they are no longer needed"""
+        for text in texts:
+            self.cache.pop(text, None)
+            self.failed.discard(text)
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
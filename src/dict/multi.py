@@ -17,6 +17,30 @@ class CoalesceDict(Dictionary):
             if result is not None and result != '':
                 return result
         return None    
+
+    def prefetch(self, texts: Iterable[str]):
+        """Prefetch texts in dictionaries supporting it, skipping texts an earlier dictionary translates"""
+        dicts = list(self.dicts)
+        pending = list(texts)
+        for i, dictionary in enumerate(dicts):
+            if hasattr(dictionary, "prefetch"):
+                dictionary.prefetch(pending)
+            if not any(hasattr(e, "prefetch") for e in dicts[i + 1:]):
+                break
+            pending = [e for e in pending if not dictionary.translate(e)]
+
+    def release(self, texts: Iterable[str]):
+        """Release texts from dictionaries caching them"""
+        texts = list(texts)
+        for dictionary in self.dicts:
+            if hasattr(dictionary, "release"):
+                dictionary.release(texts)
+
+    def close(self):
+        """Close dictionaries holding resources"""
+        for dictionary in self.dicts:
+            if hasattr(dictionary, "close"):
+                dictionary.close()
         
         
 class AppendDict(Dictionary):
@@ -33,4 +57,24 @@ class AppendDict(Dictionary):
             result = dictionary.translate(text)
             if result is not None and result != '':
                 results.add(result)
-        return self.sep.join(results)    
\ No newline at end of file
+        return self.sep.join(results)
+
+    def prefetch(self, texts: Iterable[str]):
+        """Prefetch texts in dictionaries supporting it"""
+        texts = list(texts)
+        for dictionary in self.dicts:
+            if hasattr(dictionary, "prefetch"):
+                dictionary.prefetch(texts)
+
+    def release(self, texts: Iterable[str]):
+        """Release texts from dictionaries caching them"""
+        texts = list(texts)
+        for dictionary in self.dicts:
+            if hasattr(dictionary, "release"):
+                dictionary.release(texts)
+
+    def close(self):
+        """Close dictionaries holding resources"""
+        for dictionary in self.dicts:
+            if hasattr(dictionary, "close"):
+                dictionary.close()
@@ -0,0 +1,146 @@
+import gzip
+import io
+import lzma
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Large buffers keep the number of reads low on network mounted storage
+BUFFER_SIZE = 1024 * 1024
+
+# Magic bytes at the start of a compressed file
+MAGIC_BYTES = {
+    "gzip": b"\x1f\x8b",
+    "xz": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+}
+
+# Detect the compression from magic bytes when reading, from the extension when writing
+AUTO = "auto"
+
+# Compression of files about to be written
+EXTENSIONS = {
+    ".gz": "gzip",
+    ".xz": "xz",
+    ".zst": "zstd",
+}
+
+
+def compression_from_extension(file_path: str) -> str | None:
+    """Compression from the file extension, None for plain text"""
+    _, extension = os.path.splitext(file_path)
+    return EXTENSIONS.get(extension.lower())
+
+
+def detect_compression(file_path: str) -> str | None:
+    """Detect the compression of an existing file from its magic bytes.
+
+    Args:
+        file_path (str): Path to an existing file
+
+    Returns:
+        str | None: 'gzip', 'xz', 'zstd' or None for plain text
+    """
+    with open(file_path, "rb") as f:
+        head = f.read(max(len(magic) for magic in MAGIC_BYTES.values()))
+    for compression, magic in MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def validate_compression(compression: str | None, file_path: str):
+    """Check the compression can be handled in this environment"""
+    if compression == "zstd" and zstandard is None:
+        raise ValueError(f"Error! zstd file '{file_path}' requires the zstandard package")
+
+
+def open_text(file_path: str, mode: str = "r", encoding: str = "utf-8", compression: str | None = AUTO):
+    """Open a plain, gzip, xz or zstd text file with streaming (de)compression.
+
+    By default reading detects the compression from magic bytes, writing from the file extension.
+
+    Args:
+        file_path (str): Path to the text file
+        mode (str): 'r' to read or 'w' to write
+        encoding (str): Text encoding
+        compression (str | None): 'gzip', 'xz', 'zstd', None for plain text or AUTO to detect
+
+    Returns:
+        TextIOWrapper: Text stream, use it as a context manager
+    """
+    if mode not in ("r", "w"):
+        raise ValueError(f"Unsupported mode '{mode}', expected 'r' or 'w'")
+    if compression == AUTO:
+        compression = detect_compression(file_path) if mode == "r" else compression_from_extension(file_path)
+    validate_compression(compression, file_path)
+
+    if compression is None:
+        return open(file_path, mode, encoding=encoding, buffering=BUFFER_SIZE)
+    if mode == "r":
+        return io.TextIOWrapper(_open_decompressed(file_path, compression), encoding=encoding)
+    return io.TextIOWrapper(_open_compressed(file_path, compression), encoding=encoding)
+
+
+class _ClosingBufferedReader(io.BufferedReader):
+    """Buffered reader which also closes the compressed file underneath the decompressor"""
+
+    def __init__(self, stream, file):
+        super().__init__(stream, buffer_size=BUFFER_SIZE)
+        self.file = file
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self.file.close()
+
+
+class _ClosingBufferedWriter(io.BufferedWriter):
+    """Buffered writer which also closes the compressed file underneath the compressor"""
+
+    def __init__(self, stream, file):
+        super().__init__(stream, buffer_size=BUFFER_SIZE)
+        self.file = file
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self.file.close()
+
+
+def _open_decompressed(file_path: str, compression: str):
+    """Open a buffered binary stream decompressing the file while reading"""
+    # the compressed file is read in large blocks too, not only the decompressed output
+    raw = open(file_path, "rb", buffering=BUFFER_SIZE)
+    try:
+        if compression == "gzip":
+            stream = gzip.GzipFile(fileobj=raw, mode="rb")
+        elif compression == "xz":
+            stream = lzma.LZMAFile(raw, "rb")
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_size=BUFFER_SIZE, closefd=False)
+    except BaseException:
+        raw.close()
+        raise
+    return _ClosingBufferedReader(stream, raw)
+
+
+def _open_compressed(file_path: str, compression: str):
+    """Open a buffered binary stream compressing while writing to the file"""
+    raw = open(file_path, "wb", buffering=BUFFER_SIZE)
+    try:
+        if compression == "gzip":
+            stream = gzip.GzipFile(fileobj=raw, mode="wb")
+        elif compression == "xz":
+            stream = lzma.LZMAFile(raw, "wb")
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+    except BaseException:
+        raw.close()
+        raise
+    return _ClosingBufferedWriter(stream, raw)
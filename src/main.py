@@ -1,21 +1,29 @@
 import argparse
 import os
-from concurrent.futures import ProcessPoolExecutor
+import tracemalloc
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
 import re
 import spacy
 from sortedcontainers import SortedSet
 
-from src.perf import Stopwatch
+from src.perf import Stopwatch, MemoryBudget, MB
+from src.spill import SpillSet
+from src.fileio import AUTO, open_text, compression_from_extension, detect_compression, validate_compression
 from src.lang.de import separable_prefixes
 from src.dict.dictcc import DictCCDict
 from src.dict.argos import ArgosDict
+from src.dict.libre import LibreTranslateDict
 from src.dict import Dictionary
 from src.dict.multi import CoalesceDict, AppendDict
 
+# Lemmas prefetched at once with a memory budget
+PREFETCH_CHUNK_SIZE = 4096
+
 def read_word_set(file_path):
     """Reads the word exclusion or other wordlist file."""
     words = SortedSet()
-    with open(file_path, "r", encoding="utf-8") as file:
+    with open_text(file_path) as file:
         for line in file:
             # ignore comments links and very short lines
             if line.startswith("#"):
@@ -26,8 +34,11 @@ def read_word_set(file_path):
     return words
 
 
-def read_file_extract_lemmas(args):
-    """Reads the file and extract lemmas in the text. Separable verbs already combined."""
+def read_file_extract_lemmas(args, budget: MemoryBudget | None = None):
+    """Reads the file and extract lemmas in the text. Separable verbs already combined.
+
+    With a memory budget the lemmas may spill to disk.
+    """
     file_path = args.input
     included_pos = tuple(e.strip() for e in args.part_of_speech.split(","))
     with Stopwatch(f"Extraction of '{file_path}'"):
@@ -35,8 +46,8 @@ def read_file_extract_lemmas(args):
 
         excludes = load_organize_excluded_lemmas(args.exclude, args.organize_excludes)
 
-        text_lemmas = SortedSet()
-        with open(file_path, "r", encoding="utf-8") as file:
+        text_lemmas = SortedSet() if budget is None else SpillSet(budget)
+        with open_text(file_path) as file:
             for line in file:
                 # ignore comments links and very short lines
                 if line.startswith("#") or line.startswith("https://") or len(line) < 4:
@@ -47,14 +58,17 @@ def read_file_extract_lemmas(args):
 
     if len(excludes) > 0:
         filtered = text_lemmas - excludes
+        if budget is not None:
+            # free the temporary space of the unfiltered runs
+            text_lemmas.close()
         print(f"Found {len(filtered)} lemmas after removing excluded lemmas")
         return filtered
     return text_lemmas
 
 
-def write_lines_to_file(lines, file_path: str):
-    """Writes each line from the set to the file, one per line."""
-    with open(file_path, "w", encoding="utf-8") as file:
+def write_lines_to_file(lines, file_path: str, compression: str | None = AUTO):
+    """Writes each line from the set to the file, one per line. Compressed according to the extension by default."""
+    with open_text(file_path, "w", compression=compression) as file:
         for line in lines:
             file.write(line + "\n")
 
@@ -108,8 +122,58 @@ def parse_args(args=None):
         "--method",
         type=str,
         default="coalesce",
-        choices=("dictcc", "argos", "coalesce", "append"),
-        help="method determines the translation method. dict_cc is an offline tabular dictionary, argos is a neural network, serial defaults to dict_cc then argos"
+        choices=("dictcc", "argos", "libre", "coalesce", "append"),
+        help="method determines the translation method. dict_cc is an offline tabular dictionary, argos is a neural network, libre is a LibreTranslate compatible HTTP service, coalesce defaults to dict_cc then --mt"
+    )
+
+    parser.add_argument(
+        "--mt",
+        type=str,
+        default="argos",
+        choices=("argos", "libre"),
+        help="machine translation combined with dict_cc by coalesce and append",
+    )
+
+    parser.add_argument(
+        "--libre-url",
+        type=str,
+        default="http://localhost:5000",
+        help="base URL of the LibreTranslate compatible service",
+    )
+
+    parser.add_argument(
+        "--libre-api-key",
+        type=str,
+        default=None,
+        help="optional LibreTranslate API key",
+    )
+
+    parser.add_argument(
+        "--libre-batch-size",
+        type=int,
+        default=32,
+        help="how many lemmas per LibreTranslate request",
+    )
+
+    parser.add_argument(
+        "--libre-concurrency",
+        type=int,
+        default=4,
+        help="how many concurrent LibreTranslate requests, also the connection pool size",
+    )
+
+    parser.add_argument(
+        "--libre-timeout",
+        type=float,
+        default=10.0,
+        help="LibreTranslate request timeout in seconds",
+    )
+
+    parser.add_argument(
+        "--libre-retries",
+        type=int,
+        default=3,
+        help="how many times a failed LibreTranslate request is retried",
     )
 
     parser.add_argument(
@@ -136,6 +200,13 @@ def parse_args(args=None):
         help="Available: VERB,NOUN,ADJ,ADV,PROPN,AUX,ADP,SYM,NUM",
     )
 
+    parser.add_argument(
+        "--max-memory",
+        type=int,
+        default=None,
+        help="optional memory budget in MB. Runs one stage at a time, reports peak memory per stage and spills lemmas and translations to disk when the budget is approached",
+    )
+
     parsed_args = parser.parse_args(args)
     
     # Validate args
@@ -145,14 +216,24 @@ def parse_args(args=None):
     print(f'POS: {parsed_args.part_of_speech}')
     
     validate_path(parsed_args.input)
+    # fail before the work is done rather than when writing the output
+    validate_compression(compression_from_extension(parsed_args.output), parsed_args.output)
     method = parsed_args.method
     if method in ("dictcc", "coalesce", "append"):
         validate_exist(parsed_args.dictcc_file, f'Missing dictcc_file for method {method}')
         validate_path(parsed_args.dictcc_file)
         validate_exist(parsed_args.number, f'Missing number for method {method}')
-    if method in ("argos", "coalesce", "append"):
+    if method in ("argos", "libre", "coalesce", "append"):
         validate_exist(parsed_args.from_lang, f'Missing from_lang for method {method}')
         validate_exist(parsed_args.to_lang, f'Missing to_lang for method {method}')
+    if uses_libre(parsed_args):
+        validate_exist(parsed_args.libre_url, f'Missing libre_url for method {method}')
+        validate(parsed_args.libre_batch_size > 0, 'libre_batch_size must be positive')
+        validate(parsed_args.libre_concurrency > 0, 'libre_concurrency must be positive')
+        validate(parsed_args.libre_timeout > 0, 'libre_timeout must be positive')
+        validate(parsed_args.libre_retries >= 0, 'libre_retries must not be negative')
+    if parsed_args.max_memory is not None:
+        validate(parsed_args.max_memory > 0, 'max_memory must be positive')
 
     if parsed_args.exclude != "":
         validate_path(parsed_args.exclude)
@@ -209,15 +290,83 @@ def load_organize_excluded_lemmas(exclude_file, flag_organize_excludes):
         return SortedSet()
     excluded_lemmas = read_word_set(exclude_file)
     if flag_organize_excludes:
-        write_lines_to_file(excluded_lemmas, exclude_file)
+        # keep the compression of the file read, regardless of its extension
+        write_lines_to_file(excluded_lemmas, exclude_file, detect_compression(exclude_file))
     print(f"Found {len(excluded_lemmas)} excluded lemmas in '{exclude_file}'")
     return excluded_lemmas
 
 
+def uses_argos(args) -> bool:
+    """Check whether the method translates with argostranslate"""
+    return args.method == "argos" or (args.method in ("coalesce", "append") and args.mt == "argos")
+
+
+def uses_libre(args) -> bool:
+    """Check whether the method translates with the LibreTranslate service"""
+    return args.method == "libre" or (args.method in ("coalesce", "append") and args.mt == "libre")
+
+
+def create_libre_dict(args) -> LibreTranslateDict:
+    """Create the LibreTranslate dictionary from CLI args"""
+    return LibreTranslateDict(
+        args.libre_url,
+        args.from_lang,
+        args.to_lang,
+        batch_size=args.libre_batch_size,
+        concurrency=args.libre_concurrency,
+        timeout=args.libre_timeout,
+        retries=args.libre_retries,
+        api_key=args.libre_api_key,
+    )
+
+
+def run_inline(fn, *args) -> Future:
+    """Run fn in this process, returns a completed future like executor.submit"""
+    future = Future()
+    future.set_result(fn(*args))
+    return future
+
+
+def submit_dictionaries(args, submit) -> list[Future]:
+    """Submit dictionary creation for the method, e.g. to executor.submit"""
+    method = args.method
+    futures = []
+    # ordering matters, dict_cc is added first
+    if method in ("dictcc" , "coalesce", "append"):
+        future_dictcc = submit(DictCCDict, args.dictcc_file, args.number)
+        futures.append(future_dictcc)
+    if uses_argos(args):
+        future_argos = submit(ArgosDict, args.from_lang, args.to_lang)
+        futures.append(future_argos)
+    if uses_libre(args):
+        # connection pool cannot be pickled, always created in this process
+        futures.append(run_inline(create_libre_dict, args))
+
+    validate(len(futures) > 0, f"Unsupported dictionary method: {method}")
+    return futures
+
+
+def combine_dictionaries(method: str, dicts: list[Dictionary]) -> Dictionary:
+    """Combine the dictionaries according to the method, preserving their ordering"""
+    if method == "coalesce":
+        return CoalesceDict(dicts)
+    if method == "append":
+        return AppendDict(dicts)
+    return dicts[0]
+
+
+def chunked(items, size: int):
+    """Yield lists of up to size items"""
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
 def validate_path(path):
-    """Check the path really exists"""
+    """Check the path really exists and its compression, if any, can be read"""
     if not os.path.isfile(path):
         raise FileNotFoundError(f"Error! File not found '{path}'")
+    validate_compression(detect_compression(path), path)
 
 
 def validate(expr: bool, message: str):
@@ -237,47 +386,76 @@ def main(args=None):
     """Main function, accepts CLI args"""
     args = parse_args(args)
 
-    with ProcessPoolExecutor(4) as executor:
-        method = args.method
-        
-        # future_lemmas = executor.submit(read_file_extract_lemmas, args)
-
-        futures = []
-        # ordering matters, dict_cc is added first
-        if method in ("dictcc" , "coalesce", "append"):
-            future_dictcc = executor.submit(DictCCDict, args.dictcc_file, args.number)
-            futures.append(future_dictcc)
-        if method in ("argos" , "coalesce", "append"):
-            future_argos = executor.submit(ArgosDict, args.from_lang, args.to_lang)
-            futures.append(future_argos)
-        
-        validate(len(futures) > 0, f"Unsupported dictionary method: {method}")
-        
-        lemmas = read_file_extract_lemmas(args)
-        if method == "coalesce":
-            # preserve task ordering
-            dictionary: Dictionary = CoalesceDict([f.result() for f in futures])
-        elif method == "append":
-            # preserve task ordering
-            dictionary: Dictionary = AppendDict([f.result() for f in futures])
-        else:
-            dictionary: Dictionary = futures[0].result()
-    
-    with Stopwatch("Translation"):
-        translated = SortedSet()
-        for lemma in lemmas:
-            translated_lemma = dictionary.translate(lemma)
-            if translated_lemma is not None:
-                line = f"{lemma}: {translated_lemma}"
-                translated.add(line)
+    if args.max_memory is None:
+        build_vocabulary(args)
+        return
+
+    depth = len(Stopwatch.tracing)
+    # leave tracing on if the caller started it
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        build_vocabulary(args, MemoryBudget(args.max_memory * MB))
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        # drop stopwatches left measuring by a failed stage
+        del Stopwatch.tracing[depth:]
+
+
+def build_vocabulary(args, budget: MemoryBudget | None = None):
+    """Extract lemmas, translate and write the vocabulary file, within the memory budget if any"""
+    if budget is None:
+        with ProcessPoolExecutor(4) as executor:
+            futures = submit_dictionaries(args, executor.submit)
+            lemmas = read_file_extract_lemmas(args)
+            dictionary = combine_dictionaries(args.method, [f.result() for f in futures])
+    else:
+        # one stage at a time in this process, the spaCy model is released before
+        # the dictionaries are loaded and dict.cc is not pickled back from a worker
+        lemmas = read_file_extract_lemmas(args, budget)
+        futures = submit_dictionaries(args, run_inline)
+        dictionary = combine_dictionaries(args.method, [f.result() for f in futures])
+
+    try:
+        with Stopwatch("Translation"):
+            translated = SortedSet() if budget is None else SpillSet(budget)
+            # with a budget the lemmas are prefetched chunk by chunk, spilled lemmas stay on disk
+            chunks = [lemmas] if budget is None else chunked(lemmas, PREFETCH_CHUNK_SIZE)
+            for chunk in chunks:
+                if hasattr(dictionary, "prefetch"):
+                    dictionary.prefetch(chunk)
+                for lemma in chunk:
+                    translated_lemma = dictionary.translate(lemma)
+                    if translated_lemma is not None:
+                        line = f"{lemma}: {translated_lemma}"
+                        translated.add(line)
+                if budget is not None and hasattr(dictionary, "release"):
+                    dictionary.release(chunk)
+    finally:
+        # release pooled connections of HTTP dictionaries
+        if hasattr(dictionary, "close"):
+            dictionary.close()
+        if budget is not None:
+            lemmas.close()
 
     # sectioning by initials
     initials = SortedSet(map(lambda x: f"{x[0]} --- {x[0]} --- {x[0]}", translated))
-    sectioned = SortedSet(translated)
-    sectioned.update(initials)
-
     print(f"Write translated lemmas '{args.output}' with size: {len(translated)}")
-    write_lines_to_file(sectioned, args.output)
+    with Stopwatch(f"Write '{args.output}'"):
+        if budget is None:
+            sectioned = SortedSet(translated)
+            sectioned.update(initials)
+        else:
+            # runs on disk are merged while writing
+            translated.update(initials)
+            sectioned = translated
+        try:
+            write_lines_to_file(sectioned, args.output)
+        finally:
+            if budget is not None:
+                translated.close()
 
 
 if __name__ == "__main__":
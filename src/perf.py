@@ -1,20 +1,131 @@
+import os
+import sys
 import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+MB = 1024 * 1024
+
+
+def current_rss() -> int | None:
+    """Current resident set size in bytes, None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def reset_peak_rss() -> bool:
+    """Reset the peak resident set size, only possible on Linux"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss() -> int | None:
+    """Peak resident set size in bytes since the last reset_peak_rss, None where /proc is unavailable"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    # VmHWM:     12345 kB
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+def process_peak_rss() -> int | None:
+    """Peak resident set size over the whole process lifetime in bytes, None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemoryBudget:
+    """Memory budget in bytes, approached once the usage passes the threshold fraction"""
+
+    def __init__(self, max_bytes: int, threshold: float = 0.8):
+        self.max_bytes = max_bytes
+        self.threshold = threshold
+
+    def usage(self) -> int:
+        """Current RSS, falls back to traced memory"""
+        rss = current_rss()
+        if rss is not None:
+            return rss
+        return tracemalloc.get_traced_memory()[0]
+
+    def approached(self) -> bool:
+        """Check whether the usage is close to the budget"""
+        return self.usage() >= self.max_bytes * self.threshold
+
 
 class Stopwatch:
-    """This class measures elapsed time from enter to exit in seconds"""
+    """This class measures elapsed time from enter to exit in seconds.
+
+    While tracemalloc is tracing, it also reports peak traced memory and peak RSS of the stage.
+    Where the peak RSS cannot be reset, the peak RSS of the whole process is reported instead.
+    """
+
+    # Stopwatches measuring traced memory, nested ones share the tracemalloc peak
+    tracing: list["Stopwatch"] = []
 
     def __init__(self, name="Process"):
         self.name = name
         self.start = None
         self.end = None
         self.elapsed = None
+        self.peak_traced = None
+        self.peak_rss = None
 
     def __enter__(self):
         # print(self.name)
+        if tracemalloc.is_tracing():
+            # keep the outer peaks before the peak is reset for this stage
+            Stopwatch.update_peaks()
+            tracemalloc.reset_peak()
+            self.peak_traced = 0
+            if reset_peak_rss():
+                self.peak_rss = 0
+            Stopwatch.tracing.append(self)
         self.start = time.perf_counter()
         return self
 
     def __exit__(self, *args):
         self.end = time.perf_counter()
         self.elapsed = self.end - self.start
-        print(f"{self.name} elapsed: {self.elapsed:.2f} seconds")
+        message = f"{self.name} elapsed: {self.elapsed:.2f} seconds"
+        if self in Stopwatch.tracing:
+            Stopwatch.update_peaks()
+            Stopwatch.tracing.remove(self)
+            message += f", peak traced: {self.peak_traced / MB:.1f} MB"
+            if self.peak_rss is not None:
+                message += f", peak RSS: {self.peak_rss / MB:.1f} MB"
+            else:
+                rss = process_peak_rss()
+                if rss is not None:
+                    message += f", process peak RSS: {rss / MB:.1f} MB"
+        print(message)
+
+    @staticmethod
+    def update_peaks():
+        """Fold the current tracemalloc and RSS peaks into all measuring stopwatches"""
+        if not tracemalloc.is_tracing():
+            return
+        _, peak = tracemalloc.get_traced_memory()
+        rss = peak_rss()
+        for stopwatch in Stopwatch.tracing:
+            stopwatch.peak_traced = max(stopwatch.peak_traced, peak)
+            if stopwatch.peak_rss is not None and rss is not None:
+                stopwatch.peak_rss = max(stopwatch.peak_rss, rss)
@@ -0,0 +1,113 @@
+import heapq
+import os
+import tempfile
+from typing import Iterable
+
+from sortedcontainers import SortedSet
+
+from src.perf import MemoryBudget
+
+# Small buffers, all runs are open at once while merging
+RUN_BUFFER_SIZE = 64 * 1024
+
+# How many additions between budget checks
+CHECK_EVERY = 1024
+
+class SpillSet:
+    """Sorted set of strings which spills to sorted runs on disk when the memory budget is approached.
+
+    Items must not contain new lines. Iteration merges the runs with the items still in memory.
+    """
+
+    def __init__(self, budget: MemoryBudget, items: Iterable[str] = (), check_every: int | None = None, max_runs: int = 64):
+        self.budget = budget
+        self.check_every = CHECK_EVERY if check_every is None else check_every
+        self.max_runs = max_runs
+        self.buffer = SortedSet()
+        self.runs: list[str] = []
+        self.directory = None
+        self.added = 0
+        # names every run file uniquely, also merged runs
+        self.written_runs = 0
+        self.update(items)
+
+    def add(self, item: str):
+        """Add item, checking the budget every check_every additions"""
+        self.buffer.add(item)
+        self.added += 1
+        if self.added % self.check_every == 0 and self.budget.approached():
+            self.spill()
+
+    def update(self, items: Iterable[str]):
+        """Add all items"""
+        for item in items:
+            self.add(item)
+
+    def spill(self):
+        """Write the items in memory to a sorted run on disk"""
+        if len(self.buffer) == 0:
+            return
+        self.write_run(self.buffer)
+        self.buffer.clear()
+        if len(self.runs) >= self.max_runs:
+            # merge the runs to keep the number of open files low while iterating
+            runs = self.runs
+            self.runs = []
+            self.write_run(self.merge(runs, ()))
+            for path in runs:
+                os.remove(path)
+
+    def write_run(self, items: Iterable[str]):
+        """Write sorted items to a new run file"""
+        if self.directory is None:
+            self.directory = tempfile.TemporaryDirectory(prefix="vocabulary-")
+        path = os.path.join(self.directory.name, f"run{self.written_runs}.txt")
+        self.written_runs += 1
+        with open(path, "w", encoding="utf-8", buffering=RUN_BUFFER_SIZE) as f:
+            for item in items:
+                f.write(item + "\n")
+        self.runs.append(path)
+
+    def merge(self, runs: list[str], items: Iterable[str]):
+        """Yield sorted unique items merged from the run files and the sorted items"""
+        files = [open(path, "r", encoding="utf-8", buffering=RUN_BUFFER_SIZE) for path in runs]
+        try:
+            streams = [(line[:-1] for line in f) for f in files]
+            previous = None
+            for item in heapq.merge(items, *streams):
+                if item != previous:
+                    previous = item
+                    yield item
+        finally:
+            for f in files:
+                f.close()
+
+    def __iter__(self):
+        return self.merge(self.runs, self.buffer)
+
+    def __len__(self):
+        if len(self.runs) == 0:
+            return len(self.buffer)
+        return sum(1 for _ in self)
+
+    def __sub__(self, other):
+        return SpillSet(
+            self.budget,
+            (e for e in self if e not in other),
+            self.check_every,
+            self.max_runs,
+        )
+
+    def close(self):
+        """Remove the runs on disk and the items in memory"""
+        self.buffer.clear()
+        self.runs = []
+        if self.directory is not None:
+            self.directory.cleanup()
+            self.directory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
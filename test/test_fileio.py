@@ -0,0 +1,92 @@
+import gzip
+import lzma
+import os
+import tempfile
+import unittest
+
+from src.fileio import open_text, detect_compression, zstandard
+
+class TestFileIO(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open("test/de_en.txt", "rb") as f:
+            self.content = f.read()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_detect_compression(self):
+        """Test compression is detected from magic bytes regardless of extension"""
+        self.assertIsNone(detect_compression(self.write("plain.txt", self.content)))
+        self.assertEqual("gzip", detect_compression(self.write("gzip.txt", gzip.compress(self.content))))
+        self.assertEqual("xz", detect_compression(self.write("xz.txt", lzma.compress(self.content))))
+        self.assertIsNone(detect_compression(self.write("empty.gz", b"")))
+
+    def test_read_compressed(self):
+        """Test compressed files read the same lines as plain text"""
+        with open_text("test/de_en.txt") as f:
+            expected = f.readlines()
+        for path in (
+            self.write("de_en.txt.gz", gzip.compress(self.content)),
+            self.write("de_en.txt.xz", lzma.compress(self.content)),
+        ):
+            with open_text(path) as f:
+                self.assertEqual(expected, f.readlines(), path)
+
+    def test_write_compressed(self):
+        """Test writing compresses by extension and reads back"""
+        for name, compression in (("out.txt", None), ("out.gz", "gzip"), ("out.xz", "xz")):
+            path = os.path.join(self.tmp.name, name)
+            with open_text(path, "w") as f:
+                f.write("Arzt\nOhr\n")
+            self.assertEqual(compression, detect_compression(path))
+            with open_text(path) as f:
+                self.assertEqual(["Arzt\n", "Ohr\n"], f.readlines())
+
+    def test_write_keeps_compression(self):
+        """Test an explicit compression overrides the extension"""
+        path = self.write("exclude.txt", gzip.compress(b"Ohr\n"))
+        with open_text(path, "w", compression=detect_compression(path)) as f:
+            f.write("Arzt\n")
+        self.assertEqual("gzip", detect_compression(path))
+        with open_text(path) as f:
+            self.assertEqual(["Arzt\n"], f.readlines())
+
+    def test_compressed_file_closed(self):
+        """Test the compressed file underneath the decompressor is closed with the text stream"""
+        for data in (gzip.compress(self.content), lzma.compress(self.content)):
+            with open_text(self.write("de_en.txt", data)) as f:
+                f.readline()
+                raw = f.buffer.file
+            self.assertTrue(raw.closed)
+
+    @unittest.skipUnless(zstandard, "optional zstandard package is not installed")
+    def test_zstd(self):
+        """Test zstd files are detected, read, written and closed like the others"""
+        path = self.write("de_en.txt", zstandard.compress(self.content))
+        self.assertEqual("zstd", detect_compression(path))
+        with open_text(path) as f:
+            self.assertEqual(self.content.decode("utf-8"), f.read())
+            raw = f.buffer.file
+        self.assertTrue(raw.closed)
+        path = os.path.join(self.tmp.name, "out.zst")
+        with open_text(path, "w") as f:
+            f.write("Arzt\nOhr\n")
+        self.assertEqual("zstd", detect_compression(path))
+        with open_text(path) as f:
+            self.assertEqual(["Arzt\n", "Ohr\n"], f.readlines())
+
+    @unittest.skipIf(zstandard, "zstandard package is installed")
+    def test_zstd_missing(self):
+        """Test zstd files are rejected with a clear error without the zstandard package"""
+        with self.assertRaises(ValueError):
+            open_text(os.path.join(self.tmp.name, "out.zst"), "w")
+
+if __name__ == "__main__":
+    unittest.main()
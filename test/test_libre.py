@@ -0,0 +1,156 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from src.dict.libre import LibreTranslateDict
+from src.dict.multi import CoalesceDict, AppendDict
+
+TRANSLATIONS = {"Arzt": "doctor", "Ohr": "ear", "gehen": "go"}
+
+class StubHandler(BaseHTTPRequestHandler):
+    """LibreTranslate compatible /translate endpoint with a fixed vocabulary"""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        payload = json.loads(body)
+        self.server.requests.append(payload)
+        if self.server.failures > 0:
+            self.server.failures -= 1
+            self.reply(503, {"error": "unavailable"})
+            return
+        if self.server.body is not None:
+            self.reply(200, self.server.body)
+            return
+        texts = payload["q"]
+        if isinstance(texts, list):
+            translated = [TRANSLATIONS.get(e, "") for e in texts]
+            if self.server.drop_last:
+                translated = translated[:-1]
+        else:
+            translated = TRANSLATIONS.get(texts, "")
+        self.reply(200, {"translatedText": translated})
+
+    def reply(self, status, content):
+        data = json.dumps(content).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+class FixedDict:
+    """Dictionary knowing a single word"""
+
+    def translate(self, text):
+        return "medic" if text == "Arzt" else None
+
+class TestLibreTranslateDict(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.requests = []
+        self.server.failures = 0
+        self.server.drop_last = False
+        self.server.body = None
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        host, port = self.server.server_address
+        self.dictionary = LibreTranslateDict(f"http://{host}:{port}", "de", "en", batch_size=2, concurrency=2, retries=2)
+
+    def tearDown(self):
+        self.dictionary.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_translate(self):
+        """Test single translation and caching"""
+        self.assertEqual("doctor", self.dictionary.translate("Arzt"))
+        self.assertEqual("doctor", self.dictionary.translate("Arzt"))
+        self.assertEqual(1, len(self.server.requests))
+        self.assertEqual("de", self.server.requests[0]["source"])
+        self.assertEqual("en", self.server.requests[0]["target"])
+
+    def test_prefetch_batches(self):
+        """Test prefetch sends batches and later translations come from cache"""
+        self.dictionary.prefetch(["Arzt", "Ohr", "gehen", "Arzt"])
+        self.assertEqual(2, len(self.server.requests))
+        self.assertEqual("doctor", self.dictionary.translate("Arzt"))
+        self.assertEqual("ear", self.dictionary.translate("Ohr"))
+        self.assertEqual("go", self.dictionary.translate("gehen"))
+        self.assertEqual(2, len(self.server.requests))
+
+    def test_retry(self):
+        """Test failed requests are retried"""
+        self.server.failures = 1
+        self.assertEqual("ear", self.dictionary.translate("Ohr"))
+        self.assertEqual(2, len(self.server.requests))
+
+    def test_mismatched_translations(self):
+        """Test a response with fewer translations than texts is rejected"""
+        self.server.drop_last = True
+        with self.assertRaises(ValueError):
+            self.dictionary.request(["Arzt", "Ohr"])
+
+    def test_malformed_response(self):
+        """Test a response without a list of translated texts fails the batch"""
+        for body in ({"translatedText": "ok"}, {"error": "none"}, ["ok", "ok"], {"translatedText": [1, 2]}):
+            self.server.body = body
+            with self.assertRaises(ValueError):
+                self.dictionary.request(["Arzt", "Ohr"])
+        self.dictionary.prefetch(["Arzt", "Ohr"])
+        self.assertEqual({}, self.dictionary.cache)
+        self.assertEqual({"Arzt", "Ohr"}, self.dictionary.failed)
+
+    def test_translate_failure(self):
+        """Test a failing single request translates to None without aborting"""
+        self.server.failures = 3
+        self.assertIsNone(self.dictionary.translate("Ohr"))
+        self.assertIsNone(self.dictionary.translate("Ohr"))
+        self.assertEqual(3, len(self.server.requests))
+
+    def test_prefetch_failed_batch(self):
+        """Test a batch failing after its retries leaves its texts untranslated without aborting"""
+        self.server.failures = 3
+        self.dictionary.prefetch(["Arzt", "Ohr"])
+        self.assertEqual(3, len(self.server.requests))
+        self.assertIsNone(self.dictionary.translate("Arzt"))
+        self.assertIsNone(self.dictionary.translate("Ohr"))
+        self.assertEqual(3, len(self.server.requests))
+        self.assertEqual("go", self.dictionary.translate("gehen"))
+
+    def test_release(self):
+        """Test released texts are dropped from the cache"""
+        dictionary = CoalesceDict([FixedDict(), self.dictionary])
+        dictionary.prefetch(["Ohr", "gehen"])
+        dictionary.release(["Ohr"])
+        self.assertEqual(["gehen"], list(self.dictionary.cache))
+
+    def test_close(self):
+        """Test coalesce and append close the dictionaries holding connections"""
+        for combined in (CoalesceDict, AppendDict):
+            with patch.object(self.dictionary, "close") as close:
+                combined([FixedDict(), self.dictionary]).close()
+            close.assert_called_once()
+
+    def test_coalesce_prefetch(self):
+        """Test coalesce only prefetches texts earlier dictionaries cannot translate"""
+        dictionary = CoalesceDict([FixedDict(), self.dictionary])
+        dictionary.prefetch(["Arzt", "Ohr"])
+        self.assertEqual([["Ohr"]], [e["q"] for e in self.server.requests])
+        self.assertEqual("medic", dictionary.translate("Arzt"))
+        self.assertEqual("ear", dictionary.translate("Ohr"))
+
+    def test_append_prefetch(self):
+        """Test append prefetches all texts"""
+        dictionary = AppendDict([FixedDict(), self.dictionary])
+        dictionary.prefetch(["Arzt"])
+        self.assertEqual(1, len(self.server.requests))
+        self.assertEqual(["medic", "doctor"], sorted(dictionary.translate("Arzt").split(", "), reverse=True))
+
+if __name__ == "__main__":
+    unittest.main()
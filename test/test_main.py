@@ -1,7 +1,11 @@
 import unittest
 from src.main import parse_args, main, validate_path
 import os
+import tracemalloc
+from unittest.mock import patch
 from src.perf import Stopwatch
+from src.fileio import zstandard
+from src.spill import SpillSet
 
 class TestMain(unittest.TestCase):
     def test_args(self):
@@ -56,6 +60,52 @@ class TestMain(unittest.TestCase):
             ]
         )
 
+    def test_args_libre(self):
+        """Test argument parsing for coalesce with LibreTranslate"""
+        args = parse_args(
+            [
+                "-m",
+                "coalesce",
+                "--mt",
+                "libre",
+                "--libre-url",
+                "http://localhost:5001",
+                "--libre-concurrency",
+                "8",
+                "-d",
+                "test/de_en.txt",
+                "-i",
+                "test/sample1.txt",
+            ]
+        )
+        self.assertEqual("libre", args.mt)
+        self.assertEqual("http://localhost:5001", args.libre_url)
+        self.assertEqual(8, args.libre_concurrency)
+        self.assertEqual(32, args.libre_batch_size)
+
+    def test_args_libre_invalid(self):
+        """Test invalid LibreTranslate settings are rejected"""
+        for option, value in (("--libre-batch-size", "0"), ("--libre-concurrency", "0"), ("--libre-timeout", "0"), ("--libre-retries", "-1")):
+            with self.assertRaises(ValueError):
+                parse_args(["-m", "libre", "-i", "test/sample1.txt", option, value])
+
+    @unittest.skipIf(zstandard, "zstandard package is installed")
+    def test_args_output_zstd_missing(self):
+        """Test a zstd output without the zstandard package is rejected while parsing"""
+        with self.assertRaises(ValueError):
+            parse_args(
+                [
+                    "-m",
+                    "dictcc",
+                    "-d",
+                    "test/de_en.txt",
+                    "-o",
+                    "test/vocab1.txt.zst",
+                    "-i",
+                    "test/sample1.txt",
+                ]
+            )
+
     def test_create_vocab_dictcc(self):
         """Test main creates vocab file with the right content"""
         output = "test/vocab_dictcc.txt"
@@ -84,6 +134,80 @@ class TestMain(unittest.TestCase):
         self.assertFalse("vielleicht" in content)
         os.remove(output)
 
+    def test_create_vocab_max_memory(self):
+        """Test main with a tiny memory budget spills to disk and creates the same vocab file"""
+        expected_output = "test/vocab_no_budget.txt"
+        output = "test/vocab_max_memory.txt"
+        args = [
+            "-m",
+            "dictcc",
+            "-i",
+            "test/sample1.txt",
+            "-e",
+            "test/exclude1.txt",
+            "-d",
+            "test/de_en.txt",
+        ]
+        main(args + ["-o", expected_output])
+        # check the budget on every addition so the small sample spills
+        with patch("src.spill.CHECK_EVERY", 1), patch.object(SpillSet, "spill", autospec=True, side_effect=SpillSet.spill) as spill:
+            main(args + ["-o", output, "--max-memory", "1"])
+        self.assertGreater(spill.call_count, 0)
+        validate_path(output)
+        with open(expected_output, "rb") as f:
+            expected = f.read()
+        with open(output, "rb") as f:
+            content = f.read()
+        self.assertEqual(expected, content)
+        self.assertRegex(content.decode("utf-8"), r"Arzt.*[Dd]octor")
+        os.remove(expected_output)
+        os.remove(output)
+
+    def test_max_memory_failure_stops_tracing(self):
+        """Test a failing stage with a memory budget stops tracemalloc"""
+        with patch("src.main.DictCCDict", side_effect=ValueError("broken dictionary")):
+            with self.assertRaises(ValueError):
+                main(
+                    [
+                        "-m",
+                        "dictcc",
+                        "-i",
+                        "test/sample1.txt",
+                        "-o",
+                        "test/vocab_failure.txt",
+                        "-d",
+                        "test/de_en.txt",
+                        "--max-memory",
+                        "1"
+                    ]
+                )
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual([], Stopwatch.tracing)
+
+    def test_max_memory_keeps_caller_tracing(self):
+        """Test a budgeted run leaves tracemalloc on when the caller started it"""
+        tracemalloc.start()
+        try:
+            with patch("src.main.DictCCDict", side_effect=ValueError("broken dictionary")):
+                with self.assertRaises(ValueError):
+                    main(
+                        [
+                            "-m",
+                            "dictcc",
+                            "-i",
+                            "test/sample1.txt",
+                            "-o",
+                            "test/vocab_failure.txt",
+                            "-d",
+                            "test/de_en.txt",
+                            "--max-memory",
+                            "1"
+                        ]
+                    )
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+
     def test_create_vocab_argos(self):
         """Test main creates vocab file with the right content"""
         output = "test/vocab_argos.txt"
@@ -0,0 +1,45 @@
+import io
+import tracemalloc
+import unittest
+from contextlib import redirect_stdout
+
+from src.perf import Stopwatch, reset_peak_rss
+
+class TestStopwatch(unittest.TestCase):
+    def test_memory_report(self):
+        """Test nested stopwatches report their own peak traced memory"""
+        output = io.StringIO()
+        tracemalloc.start()
+        try:
+            with redirect_stdout(output):
+                with Stopwatch("Outer") as outer:
+                    data = bytearray(4 * 1024 * 1024)
+                    del data
+                    with Stopwatch("Inner") as inner:
+                        pass
+        finally:
+            tracemalloc.stop()
+        self.assertGreaterEqual(outer.peak_traced, 4 * 1024 * 1024)
+        self.assertLess(inner.peak_traced, 4 * 1024 * 1024)
+        self.assertIn("Outer elapsed", output.getvalue())
+        self.assertIn("peak traced", output.getvalue())
+
+    @unittest.skipUnless(reset_peak_rss(), "peak RSS can only be reset on Linux")
+    def test_peak_rss_per_stage(self):
+        """Test a stage after a large allocation does not report the earlier peak RSS"""
+        size = 64 * 1024 * 1024
+        tracemalloc.start()
+        try:
+            with redirect_stdout(io.StringIO()):
+                with Stopwatch("Large") as large:
+                    data = b"x" * size
+                    del data
+                with Stopwatch("Small") as small:
+                    pass
+        finally:
+            tracemalloc.stop()
+        self.assertGreaterEqual(large.peak_rss, size)
+        self.assertLess(small.peak_rss, large.peak_rss - size // 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import unittest
+
+from sortedcontainers import SortedSet
+
+from src.perf import MemoryBudget
+from src.spill import SpillSet
+
+WORDS = ["Ohr", "gehen", "Arzt", "schön", "Ohr", "aufstehen", "Arzt", "Zug", "bald", "gehen"]
+
+class TestSpillSet(unittest.TestCase):
+    def test_in_memory(self):
+        """Test a generous budget keeps everything in memory"""
+        spill = SpillSet(MemoryBudget(1024 ** 4), WORDS, check_every=2)
+        self.assertEqual(0, len(spill.runs))
+        self.assertEqual(list(SortedSet(WORDS)), list(spill))
+        self.assertEqual(len(SortedSet(WORDS)), len(spill))
+
+    def test_spill(self):
+        """Test an exhausted budget spills sorted runs which merge like a SortedSet"""
+        spill = SpillSet(MemoryBudget(1), WORDS, check_every=3)
+        self.assertEqual(3, len(spill.runs))
+        self.assertEqual(list(SortedSet(WORDS)), list(spill))
+        self.assertEqual(len(SortedSet(WORDS)), len(spill))
+
+    def test_merge_runs(self):
+        """Test runs are merged once there are too many"""
+        spill = SpillSet(MemoryBudget(1), WORDS, check_every=1, max_runs=4)
+        self.assertLess(len(spill.runs), 4)
+        self.assertEqual(list(SortedSet(WORDS)), list(spill))
+
+    def test_single_run(self):
+        """Test a single allowed run keeps merging into a new run"""
+        spill = SpillSet(MemoryBudget(1), ["b", "a", "c", "d"], check_every=2, max_runs=1)
+        self.assertEqual(1, len(spill.runs))
+        self.assertEqual(["a", "b", "c", "d"], list(spill))
+
+    def test_close(self):
+        """Test closing removes the runs on disk"""
+        with SpillSet(MemoryBudget(1), WORDS, check_every=2) as spill:
+            directory = spill.directory.name
+            self.assertTrue(os.path.isdir(directory))
+        self.assertFalse(os.path.exists(directory))
+        self.assertEqual([], list(spill))
+
+    def test_sub(self):
+        """Test subtraction of excluded words"""
+        spill = SpillSet(MemoryBudget(1), WORDS, check_every=2)
+        excludes = SortedSet(["Arzt", "bald"])
+        self.assertEqual(list(SortedSet(WORDS) - excludes), list(spill - excludes))
+
+if __name__ == "__main__":
+    unittest.main()